@@ -1,6 +1,10 @@
+import asyncio
 import json
 import os
 import sqlite3
+import threading
+
+import jsonutil
 
 # DB location is configurable so it can live on a persistent disk in production.
 # On Render the app directory is ephemeral (wiped each deploy); set DATABASE_PATH
@@ -8,107 +12,276 @@ import sqlite3
 # rubric rotation survive restarts/deploys. Falls back to a local file for dev.
 DB_PATH = os.getenv("DATABASE_PATH") or os.path.join(os.path.dirname(__file__), "data.db")
 
+# One long-lived connection for the whole process instead of connect() per call:
+# skips the file open + journal setup + cold page cache on every query. WAL lets
+# readers proceed while a write commits; synchronous=NORMAL is safe under WAL.
+# mmap_size (~30 MB, well above this DB) serves reads straight from the mapped
+# file instead of copying pages into SQLite's own buffers.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=30000000",
+)
+_CONN: sqlite3.Connection | None = None
+_CONN_LOCK = threading.Lock()
+# sqlite3 is synchronous and the connection is shared, so writes (each its own
+# transaction via ``with conn:``) are serialized.
+_WRITE_LOCK = threading.Lock()
+
+# Known users as loaded/last written: user_id -> (chat_id, sign, username). An
+# inbound update from an unchanged user skips the upsert entirely and the sign is
+# answered from memory, so steady-state messages do no DB work at all. Loaded
+# when the connection opens; kept current by upsert_user() and set_user_sign().
+_USERS: dict[int, tuple[int, str | None, str | None]] = {}
+
+# Hot-path SQL. sqlite3 keeps compiled statements in a per-connection cache keyed
+# on the SQL text, so with the one shared connection each is parsed only once.
+_SQL_UPSERT_USER = """
+    INSERT INTO users (user_id, chat_id, username)
+    VALUES (?, ?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET
+        chat_id = excluded.chat_id,
+        username = excluded.username
+"""
+_SQL_UPSERT_USER_RETURNING_SIGN = _SQL_UPSERT_USER + "    RETURNING sign\n"
+# RETURNING needs SQLite 3.35+; older builds fall back to a follow-up SELECT.
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+_SQL_SET_SIGN = "UPDATE users SET sign = ? WHERE user_id = ?"
+_SQL_GET_SIGN = "SELECT sign FROM users WHERE user_id = ?"
+_SQL_ALL_USERS = "SELECT user_id, chat_id, sign FROM users"
+_SQL_LOAD_CONTEXT = "SELECT context_json FROM daily_context WHERE date = ?"
+_SQL_SAVE_CONTEXT = """
+    INSERT INTO daily_context (date, context_json)
+    VALUES (?, ?)
+    ON CONFLICT(date) DO UPDATE SET
+        context_json = excluded.context_json
+"""
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    _load_users(conn)
+    return conn
+
+
+def _load_users(conn: sqlite3.Connection) -> None:
+    _USERS.clear()
+    try:
+        rows = conn.execute("SELECT user_id, chat_id, sign, username FROM users")
+    except sqlite3.OperationalError:  # fresh DB: init_db() hasn't created it yet
+        return
+    for user_id, chat_id, sign, username in rows:
+        _USERS[user_id] = (chat_id, sign, username)
+
+
+def _conn() -> sqlite3.Connection:
+    """Return the shared connection, opening it on first use.
+
+    init_db() opens it at startup; scripts and notebooks that skip init_db
+    still work.
+    """
+    global _CONN
+    if _CONN is None:
+        with _CONN_LOCK:
+            if _CONN is None:
+                _CONN = _connect()
+    return _CONN
+
+
+# Whole schema in one script so init_db() creates it in a single transaction
+# (one commit/fsync instead of one per table).
+_SCHEMA = """
+    BEGIN;
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        chat_id INTEGER NOT NULL,
+        username TEXT,
+        sign TEXT
+    );
+    CREATE TABLE IF NOT EXISTS daily_context (
+        date TEXT PRIMARY KEY,
+        context_json BLOB NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS rubric_history (
+        date TEXT NOT NULL,
+        rubric TEXT NOT NULL,
+        subject TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS daily_background (
+        date TEXT PRIMARY KEY,
+        png BLOB NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS daily_broadcast (
+        date TEXT PRIMARY KEY
+    );
+    CREATE TABLE IF NOT EXISTS daily_batch (
+        date TEXT PRIMARY KEY,
+        batch_id TEXT NOT NULL,
+        news_blob TEXT NOT NULL
+    );
+    COMMIT;
+"""
+
 
 def init_db() -> None:
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                chat_id INTEGER NOT NULL,
-                username TEXT,
-                sign TEXT
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS daily_context (
-                date TEXT PRIMARY KEY,
-                context_json TEXT NOT NULL
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS rubric_history (
-                date TEXT NOT NULL,
-                rubric TEXT NOT NULL,
-                subject TEXT NOT NULL
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS daily_background (
-                date TEXT PRIMARY KEY,
-                png BLOB NOT NULL
-            )
-            """
-        )
+    conn = _conn()
+    with _WRITE_LOCK:
+        conn.executescript(_SCHEMA)
 
 
 def upsert_user(user_id: int, chat_id: int, username: str | None) -> None:
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute(
-            """
-            INSERT INTO users (user_id, chat_id, username)
-            VALUES (?, ?, ?)
-            ON CONFLICT(user_id) DO UPDATE SET
-                chat_id = excluded.chat_id,
-                username = excluded.username
-            """,
-            (user_id, chat_id, username),
-        )
+    cached = _USERS.get(user_id)
+    if cached and cached[0] == chat_id and cached[2] == username:
+        return
+    conn = _conn()
+    # The cache entry is re-read and replaced under the write lock: a snapshot
+    # taken before it would clobber a set_user_sign() that committed meanwhile.
+    with _WRITE_LOCK:
+        with conn:
+            conn.execute(_SQL_UPSERT_USER, (user_id, chat_id, username))
+        cached = _USERS.get(user_id)
+        _USERS[user_id] = (chat_id, cached[1] if cached else None, username)
+
+
+def upsert_user_and_get_sign(user_id: int, chat_id: int, username: str | None) -> str | None:
+    """upsert_user() + get_user_sign() in one statement (handlers need both)."""
+    cached = _USERS.get(user_id)
+    if cached and cached[0] == chat_id and cached[2] == username:
+        return cached[1] or None
+    conn = _conn()
+    with _WRITE_LOCK:
+        with conn:
+            if _HAS_RETURNING:
+                row = conn.execute(
+                    _SQL_UPSERT_USER_RETURNING_SIGN, (user_id, chat_id, username)
+                ).fetchone()
+            else:
+                conn.execute(_SQL_UPSERT_USER, (user_id, chat_id, username))
+                row = conn.execute(_SQL_GET_SIGN, (user_id,)).fetchone()
+        sign = row[0] if row else None
+        _USERS[user_id] = (chat_id, sign, username)
+    return sign or None
 
 
 def set_user_sign(user_id: int, sign: str) -> None:
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute(
-            "UPDATE users SET sign = ? WHERE user_id = ?",
-            (sign, user_id),
-        )
+    conn = _conn()
+    with _WRITE_LOCK:
+        with conn:
+            conn.execute(_SQL_SET_SIGN, (sign, user_id))
+        cached = _USERS.get(user_id)
+        if cached:
+            _USERS[user_id] = (cached[0], sign, cached[2])
 
 
 def get_user_sign(user_id: int) -> str | None:
-    with sqlite3.connect(DB_PATH) as conn:
-        row = conn.execute(
-            "SELECT sign FROM users WHERE user_id = ?",
-            (user_id,),
-        ).fetchone()
+    conn = _conn()
+    cached = _USERS.get(user_id)
+    if cached:
+        return cached[1] or None
+    row = conn.execute(_SQL_GET_SIGN, (user_id,)).fetchone()
     return row[0] if row and row[0] else None
 
 
 def get_all_users() -> list[tuple[int, int, str | None]]:
-    with sqlite3.connect(DB_PATH) as conn:
-        rows = conn.execute(
-            "SELECT user_id, chat_id, sign FROM users"
-        ).fetchall()
-    return [(row[0], row[1], row[2]) for row in rows]
+    # Rows already come back as (user_id, chat_id, sign) tuples.
+    return _conn().execute(_SQL_ALL_USERS).fetchall()
 
 
 def load_today_context(today_key: str) -> dict | None:
-    with sqlite3.connect(DB_PATH) as conn:
-        row = conn.execute(
-            "SELECT context_json FROM daily_context WHERE date = ?",
-            (today_key,),
-        ).fetchone()
+    conn = _conn()
+    row = conn.execute(_SQL_LOAD_CONTEXT, (today_key,)).fetchone()
     if not row:
         return None
-    return json.loads(row[0])
+    return jsonutil.loads(row[0])
 
 
 def save_today_context(today_key: str, context: dict) -> None:
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute(
-            """
-            INSERT INTO daily_context (date, context_json)
-            VALUES (?, ?)
-            ON CONFLICT(date) DO UPDATE SET
-                context_json = excluded.context_json
-            """,
-            (today_key, json.dumps(context)),
-        )
+    # Stored as raw UTF-8 JSON bytes (BLOB); loads() takes bytes directly. Rows
+    # written as TEXT by older versions still load: SQLite columns are
+    # dynamically typed, so an existing TEXT column simply accepts BLOBs.
+    conn = _conn()
+    with _WRITE_LOCK, conn:
+        conn.execute(_SQL_SAVE_CONTEXT, (today_key, jsonutil.dumps_bytes(context)))
+
+
+# --- Async wrappers -----------------------------------------------------------
+# sqlite3 calls block; run them on the default thread pool so one handler's DB
+# round-trip doesn't stall every other chat's update on the event loop. Async
+# code (handlers, generation, broadcast, rubrics) uses these, never the sync ones.
+
+# The unchanged-user fast path is checked here on the loop too: it's a dict
+# lookup, so dispatching it to the (shared) thread pool would only add latency.
+
+async def aupsert_user(user_id: int, chat_id: int, username: str | None) -> None:
+    cached = _USERS.get(user_id)
+    if cached and cached[0] == chat_id and cached[2] == username:
+        return
+    await asyncio.to_thread(upsert_user, user_id, chat_id, username)
+
+
+async def aupsert_user_and_get_sign(
+    user_id: int, chat_id: int, username: str | None
+) -> str | None:
+    cached = _USERS.get(user_id)
+    if cached and cached[0] == chat_id and cached[2] == username:
+        return cached[1] or None
+    return await asyncio.to_thread(upsert_user_and_get_sign, user_id, chat_id, username)
+
+
+async def aset_user_sign(user_id: int, sign: str) -> None:
+    await asyncio.to_thread(set_user_sign, user_id, sign)
+
+
+async def aget_all_users() -> list[tuple[int, int, str | None]]:
+    return await asyncio.to_thread(get_all_users)
+
+
+async def aload_today_context(today_key: str) -> dict | None:
+    return await asyncio.to_thread(load_today_context, today_key)
+
+
+async def asave_today_context(today_key: str, context: dict) -> None:
+    await asyncio.to_thread(save_today_context, today_key, context)
+
+
+async def aload_recent_intros(n_days: int = 3) -> list[str]:
+    return await asyncio.to_thread(load_recent_intros, n_days)
+
+
+async def aload_recent_vibes(n_days: int = 2) -> dict[str, list[str]]:
+    return await asyncio.to_thread(load_recent_vibes, n_days)
+
+
+async def arecord_rubric(rubric: str, subject: str, date_key: str | None = None) -> None:
+    await asyncio.to_thread(record_rubric, rubric, subject, date_key)
+
+
+async def anext_subject(rubric: str, candidates: list[str]) -> str | None:
+    return await asyncio.to_thread(next_subject, rubric, candidates)
+
+
+async def aload_today_background(today_key: str) -> bytes | None:
+    return await asyncio.to_thread(load_today_background, today_key)
+
+
+async def asave_today_background(today_key: str, png: bytes) -> None:
+    await asyncio.to_thread(save_today_background, today_key, png)
+
+
+async def aclaim_daily_broadcast(today_key: str) -> bool:
+    return await asyncio.to_thread(claim_daily_broadcast, today_key)
+
+
+async def asave_daily_batch(date_key: str, batch_id: str, news_blob: str) -> None:
+    await asyncio.to_thread(save_daily_batch, date_key, batch_id, news_blob)
+
+
+async def aload_daily_batch(date_key: str) -> tuple[str, str] | None:
+    return await asyncio.to_thread(load_daily_batch, date_key)
 
 
 # --- Workstream B: recent intros for opener variety ---------------------------
@@ -119,18 +292,18 @@ def load_recent_intros(n_days: int = 3) -> list[str]:
     Used to pass yesterday's opener into the intro prompt so the model avoids
     repeating it. Newest first. Empty list when there is no history.
     """
-    with sqlite3.connect(DB_PATH) as conn:
-        try:
-            rows = conn.execute(
-                "SELECT context_json FROM daily_context ORDER BY date DESC LIMIT ?",
-                (n_days,),
-            ).fetchall()
-        except sqlite3.OperationalError:
-            return []
+    conn = _conn()
+    try:
+        rows = conn.execute(
+            "SELECT context_json FROM daily_context ORDER BY date DESC LIMIT ?",
+            (n_days,),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []
     intros: list[str] = []
     for (raw,) in rows:
         try:
-            summary = json.loads(raw).get("global_summary", "")
+            summary = jsonutil.loads(raw).get("global_summary", "")
         except (json.JSONDecodeError, AttributeError):
             summary = ""
         if summary:
@@ -144,18 +317,18 @@ def load_recent_vibes(n_days: int = 2) -> dict[str, list[str]]:
     Used to feed each sign's recent forecast back into generation so the same
     sign doesn't repeat its theme/opener day over day. Empty when no history.
     """
-    with sqlite3.connect(DB_PATH) as conn:
-        try:
-            rows = conn.execute(
-                "SELECT context_json FROM daily_context ORDER BY date DESC LIMIT ?",
-                (n_days,),
-            ).fetchall()
-        except sqlite3.OperationalError:
-            return {}
+    conn = _conn()
+    try:
+        rows = conn.execute(
+            "SELECT context_json FROM daily_context ORDER BY date DESC LIMIT ?",
+            (n_days,),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return {}
     out: dict[str, list[str]] = {}
     for (raw,) in rows:
         try:
-            vibes = json.loads(raw).get("vibes", {}) or {}
+            vibes = jsonutil.loads(raw).get("vibes", {}) or {}
         except (json.JSONDecodeError, AttributeError):
             continue
         for sign, text in vibes.items():
@@ -170,7 +343,8 @@ def record_rubric(rubric: str, subject: str, date_key: str | None = None) -> Non
     from datetime import date as _date
 
     date_key = date_key or _date.today().isoformat()
-    with sqlite3.connect(DB_PATH) as conn:
+    conn = _conn()
+    with _WRITE_LOCK, conn:
         conn.execute(
             "INSERT INTO rubric_history (date, rubric, subject) VALUES (?, ?, ?)",
             (date_key, rubric, subject),
@@ -178,16 +352,17 @@ def record_rubric(rubric: str, subject: str, date_key: str | None = None) -> Non
 
 
 def get_used_subjects(rubric: str) -> list[str]:
-    with sqlite3.connect(DB_PATH) as conn:
-        rows = conn.execute(
-            "SELECT subject FROM rubric_history WHERE rubric = ? ORDER BY rowid",
-            (rubric,),
-        ).fetchall()
+    conn = _conn()
+    rows = conn.execute(
+        "SELECT subject FROM rubric_history WHERE rubric = ? ORDER BY rowid",
+        (rubric,),
+    ).fetchall()
     return [row[0] for row in rows]
 
 
 def clear_rubric(rubric: str) -> None:
-    with sqlite3.connect(DB_PATH) as conn:
+    conn = _conn()
+    with _WRITE_LOCK, conn:
         conn.execute("DELETE FROM rubric_history WHERE rubric = ?", (rubric,))
 
 
@@ -211,16 +386,17 @@ def next_subject(rubric: str, candidates: list[str]) -> str | None:
 # --- Workstream D: daily AI background cache (shared by cover + sign cards) ---
 
 def load_today_background(today_key: str) -> bytes | None:
-    with sqlite3.connect(DB_PATH) as conn:
-        row = conn.execute(
-            "SELECT png FROM daily_background WHERE date = ?",
-            (today_key,),
-        ).fetchone()
+    conn = _conn()
+    row = conn.execute(
+        "SELECT png FROM daily_background WHERE date = ?",
+        (today_key,),
+    ).fetchone()
     return row[0] if row else None
 
 
 def save_today_background(today_key: str, png: bytes) -> None:
-    with sqlite3.connect(DB_PATH) as conn:
+    conn = _conn()
+    with _WRITE_LOCK, conn:
         conn.execute(
             """
             INSERT INTO daily_background (date, png)
@@ -229,3 +405,47 @@ def save_today_background(today_key: str, png: bytes) -> None:
             """,
             (today_key, png),
         )
+
+
+# --- Daily broadcast de-duplication -------------------------------------------
+
+def claim_daily_broadcast(today_key: str) -> bool:
+    """Mark today's scheduled broadcast as started. False if already claimed.
+
+    Guards against a misfired/duplicated cron run re-sending to every user.
+    """
+    conn = _conn()
+    with _WRITE_LOCK, conn:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO daily_broadcast (date) VALUES (?)",
+            (today_key,),
+        )
+    return cursor.rowcount == 1
+
+
+# --- OpenAI Batch API: pending daily vibes request ------------------------------
+
+def save_daily_batch(date_key: str, batch_id: str, news_blob: str) -> None:
+    """Remember the batch submitted for ``date_key`` and the news it was built on."""
+    conn = _conn()
+    with _WRITE_LOCK, conn:
+        conn.execute(
+            """
+            INSERT INTO daily_batch (date, batch_id, news_blob)
+            VALUES (?, ?, ?)
+            ON CONFLICT(date) DO UPDATE SET
+                batch_id = excluded.batch_id,
+                news_blob = excluded.news_blob
+            """,
+            (date_key, batch_id, news_blob),
+        )
+
+
+def load_daily_batch(date_key: str) -> tuple[str, str] | None:
+    """Return (batch_id, news_blob) submitted for ``date_key``, if any."""
+    conn = _conn()
+    row = conn.execute(
+        "SELECT batch_id, news_blob FROM daily_batch WHERE date = ?",
+        (date_key,),
+    ).fetchone()
+    return (row[0], row[1]) if row else None
@@ -1,10 +1,11 @@
+import asyncio
 import json
 import logging
 import os
 import re
 import time
 from collections import Counter
-from datetime import datetime
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
 import openai
@@ -16,11 +17,14 @@ from tenacity import (
     wait_exponential,
 )
 
+import jsonutil
 from db import (
-    load_recent_intros,
-    load_recent_vibes,
-    load_today_context,
-    save_today_context,
+    aload_daily_batch,
+    aload_recent_intros,
+    aload_recent_vibes,
+    aload_today_context,
+    asave_daily_batch,
+    asave_today_context,
 )
 from news import fetch_news_blob
 from prompts.loader import load_prompt
@@ -179,7 +183,7 @@ async def complete_json(
     )
     elapsed = time.perf_counter() - start
     logger.info("OpenAI JSON call took %.2fs", elapsed)
-    return json.loads(response.choices[0].message.content)
+    return jsonutil.loads(response.choices[0].message.content)
 
 
 @retry(
@@ -206,29 +210,45 @@ async def complete_text(
     return response.choices[0].message.content.strip()
 
 
-async def generate_daily_context(
-    client: AsyncOpenAI,
-    signs: dict,
-    rss_url: str | None,
-    model: str,
-    telegram_source: dict | None = None,
-    tone: str | None = None,
-    news_blob: str | None = None,
-) -> dict:
-    if news_blob is None:
-        news_blob = await fetch_news_blob(rss_url, telegram_source=telegram_source)
+# Serialized traits/specificity config for the vibes prompt. signs comes from
+# the (cached) load_signs(), so the JSON is built once per config object.
+_SIGNS_PAYLOAD: tuple[dict, str] | None = None
 
-    signs_payload = {
-        sign: {
-            "traits": data.get("traits", []),
-            "specificity": data.get("specificity", ""),
+
+def signs_payload_json(signs: dict) -> str:
+    global _SIGNS_PAYLOAD
+    if _SIGNS_PAYLOAD is None or _SIGNS_PAYLOAD[0] is not signs:
+        payload = {
+            sign: {
+                "traits": data.get("traits", []),
+                "specificity": data.get("specificity", ""),
+            }
+            for sign, data in signs.items()
         }
-        for sign, data in signs.items()
-    }
+        _SIGNS_PAYLOAD = (signs, jsonutil.dumps(payload))
+    return _SIGNS_PAYLOAD[1]
+
+
+# The intro prompt targets <=180 chars; allow some slack before treating a draft
+# as too long and spending a second call on polishing it.
+_INTRO_POLISH_CHARS = 260
+
 
+def _intro_needs_polish(summary: str) -> bool:
+    """True if the intro from the main call is empty, overlong or opens with «Сьогодні»."""
+    summary = (summary or "").strip()
+    if not summary:
+        return True
+    return len(summary) > _INTRO_POLISH_CHARS or _first_word(summary) == "сьогодні"
+
+
+async def _vibes_messages(
+    signs: dict, news_blob: str, tone: str | None
+) -> tuple[list[dict], str]:
+    """Build the main vibes request. Returns (messages, yesterday_hint)."""
     # Anti-repeat across days: feed each sign's recent vibe opener back in so the
     # same sign doesn't recycle yesterday's theme/opening (mirrors the intro hint).
-    recent_vibes = load_recent_vibes(n_days=2)
+    recent_vibes = await aload_recent_vibes(n_days=2)
     repeat_lines = []
     for sign in signs:
         prev = recent_vibes.get(sign)
@@ -243,20 +263,33 @@ async def generate_daily_context(
             + "\n".join(repeat_lines)
         )
 
+    recent_intros = await aload_recent_intros(n_days=1)
+    yesterday_hint = (
+        f"Учора інтро починалося так: «{recent_intros[0]}» — почни сьогодні інакше."
+        if recent_intros
+        else ""
+    )
+    intro_rules = load_prompt("intro_rules")
+
     system_prompt = build_channel_system(tone)
+    # The intro rules ride along in the main call so global_summary comes back
+    # finished; the separate polish round-trip only runs as a fallback below.
     user_prompt = (
         "Повідомлення з джерела новин:\n"
         f"{news_blob}\n\n"
         "Конфіг знаків:\n"
-        f"{json.dumps(signs_payload, ensure_ascii=False)}\n\n"
+        f"{signs_payload_json(signs)}\n\n"
         "Поверни JSON з ключами: affirmation (коротке 1 речення), "
-        "global_summary (загальний настрій дня; саме тут доречно легко й "
-        "невимушено обіграти 1 новину) і vibes (обʼєкт: знак -> текст вайбу). "
+        "global_summary (готове інтро до прогнозів за правилами нижче; саме тут "
+        "доречно легко й невимушено обіграти 1 новину) і vibes (обʼєкт: знак -> "
+        "текст вайбу). "
         "Кожен вайб — 2–3 речення про характер знаку та повсякдення (гроші/"
         "кохання/дружба/робота/настрій); новину додавай лише зрідка, якщо вона "
         "легка й доречна цьому знаку (більшість вайбів — без новин). Жодної "
         "війни/політики в особистих вайбах. Жоден вайб не починається зі слова "
-        "«Сьогодні». Лише JSON."
+        "«Сьогодні». Лише JSON.\n\n"
+        f"Правила для global_summary:\n{intro_rules}"
+        + (f"\n{yesterday_hint}" if yesterday_hint else "")
         + repeat_hint
     )
 
@@ -264,11 +297,37 @@ async def generate_daily_context(
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_prompt},
     ]
-    try:
-        payload = await complete_json(client, model, messages=messages, temperature=0.9)
-    except Exception as exc:
-        logger.warning("Vibes generation failed after retries: %s", exc)
-        payload = {}
+    return messages, yesterday_hint
+
+
+async def generate_daily_context(
+    client: AsyncOpenAI,
+    signs: dict,
+    rss_url: str | None,
+    model: str,
+    telegram_source: dict | None = None,
+    tone: str | None = None,
+    news_blob: str | None = None,
+    payload: dict | None = None,
+) -> dict:
+    """Generate the day's affirmation, intro and 12 vibes.
+
+    ``payload`` is an already-obtained response to the main vibes request (the
+    Batch API path); when given, that call is skipped and only the guards and
+    post-processing run on it.
+    """
+    if news_blob is None:
+        news_blob = await fetch_news_blob(rss_url, telegram_source=telegram_source)
+
+    messages, yesterday_hint = await _vibes_messages(signs, news_blob, tone)
+    system_prompt = messages[0]["content"]
+    intro_rules = load_prompt("intro_rules")
+    if payload is None:
+        try:
+            payload = await complete_json(client, model, messages=messages, temperature=0.9)
+        except Exception as exc:
+            logger.warning("Vibes generation failed after retries: %s", exc)
+            payload = {}
 
     vibes = payload.get("vibes", {}) or {}
 
@@ -276,7 +335,7 @@ async def generate_daily_context(
     if vibes and _needs_variety_retry(vibes):
         logger.info("Variety guard triggered; retrying vibes generation once.")
         retry_messages = messages + [
-            {"role": "assistant", "content": json.dumps(payload, ensure_ascii=False)},
+            {"role": "assistant", "content": jsonutil.dumps(payload)},
             {
                 "role": "user",
                 "content": (
@@ -306,16 +365,13 @@ async def generate_daily_context(
         for sign in missing:
             vibes[sign] = FALLBACK_VIBE
 
-    # Post-process global_summary into a zodiac-forecast intro
+    # global_summary should already be the finished intro; only pay for the
+    # separate polish call when the draft is missing or clearly off-spec.
     raw_global_summary = payload.get("global_summary", "")
-    if raw_global_summary:
-        recent = load_recent_intros(n_days=1)
-        yesterday_hint = (
-            f"Учора інтро починалося так: «{recent[0]}» — почни сьогодні інакше."
-            if recent
-            else ""
-        )
+    if _intro_needs_polish(raw_global_summary):
+        logger.info("Intro draft unusable; running the polish call.")
         summary_user_prompt = load_prompt("intro").format(
+            intro_rules=intro_rules,
             news_blob=news_blob,
             raw_global_summary=raw_global_summary,
             yesterday_hint=yesterday_hint,
@@ -353,7 +409,7 @@ async def generate_daily_context(
                 model,
                 messages=messages
                 + [
-                    {"role": "assistant", "content": json.dumps(payload, ensure_ascii=False)},
+                    {"role": "assistant", "content": jsonutil.dumps(payload)},
                     {"role": "user", "content": RESPECT_CORRECTION},
                 ],
                 temperature=0.7,
@@ -372,6 +428,21 @@ async def generate_daily_context(
     return context
 
 
+# In-process copy of the daily context: every /vibe, free-text question and
+# broadcast reads it, so keep it off SQLite + JSON decoding after the first hit.
+# Keyed by date (only the newest two are kept), so it rolls over on its own. The
+# lock makes the first-of-day miss single-flight: concurrent callers wait for
+# one generation instead of each paying for their own OpenAI calls.
+_CTX_CACHE: dict[str, dict] = {}
+_CTX_LOCK = asyncio.Lock()
+
+
+def _remember_context(today_key: str, context: dict) -> None:
+    _CTX_CACHE[today_key] = context
+    for stale_key in sorted(_CTX_CACHE)[:-2]:
+        del _CTX_CACHE[stale_key]
+
+
 async def get_or_generate_context(
     client: AsyncOpenAI,
     signs: dict,
@@ -381,16 +452,186 @@ async def get_or_generate_context(
     telegram_source: dict | None = None,
 ) -> dict:
     today_key = datetime.now(timezone).date().isoformat()
-    cached = load_today_context(today_key)
-    if cached:
-        return cached
+    context = _CTX_CACHE.get(today_key)
+    if context is not None:
+        return context
+    async with _CTX_LOCK:
+        context = _CTX_CACHE.get(today_key)
+        if context is not None:
+            return context
+        context = await aload_today_context(today_key)
+        if not context:
+            # A pending batch is already paid for: use it if it has finished,
+            # otherwise cancel it since we're about to generate realtime.
+            context = await _context_from_batch(
+                client,
+                signs,
+                rss_url,
+                model,
+                today_key,
+                telegram_source=telegram_source,
+                cancel_pending=True,
+            )
+            if not context:
+                context = await generate_daily_context(
+                    client, signs, rss_url, model, telegram_source=telegram_source
+                )
+            await asave_today_context(today_key, context)
+        _remember_context(today_key, context)
+        return context
+
+
+# --- OpenAI Batch API path for the daily vibes (opt-in: OPENAI_DAILY_BATCH) ---
+# The main vibes request is the expensive call of the day and nobody waits on it
+# live, so it can go through the Batch API (half price, 24h window): submit the
+# evening before, collect shortly before the morning broadcast. The guards and
+# intro polish still run realtime on the result. Whichever comes first — the
+# collect job or a cache miss in get_or_generate_context — consumes the batch;
+# a miss that finds it still running cancels it and generates realtime, so it
+# is never billed on top of the fallback. Trade-off: the news blob is the one
+# fetched at submission time.
+
+_BATCH_IN_FLIGHT = frozenset({"validating", "in_progress", "finalizing"})
+
+
+def _batch_custom_id(date_key: str) -> str:
+    return f"vibes-{date_key}"
+
+
+async def submit_daily_batch(
+    client: AsyncOpenAI,
+    signs: dict,
+    rss_url: str | None,
+    model: str,
+    timezone: ZoneInfo,
+    telegram_source: dict | None = None,
+) -> str | None:
+    """Submit tomorrow's main vibes request as a Batch API job. Returns the batch id."""
+    date_key = (datetime.now(timezone).date() + timedelta(days=1)).isoformat()
+    news_blob = await fetch_news_blob(rss_url, telegram_source=telegram_source)
+    messages, _ = await _vibes_messages(signs, news_blob, None)
+    request = {
+        "custom_id": _batch_custom_id(date_key),
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": model,
+            "messages": messages,
+            "response_format": {"type": "json_object"},
+            "temperature": 0.9,
+        },
+    }
+    try:
+        input_file = await client.files.create(
+            file=(f"{_batch_custom_id(date_key)}.jsonl", (jsonutil.dumps(request) + "\n").encode()),
+            purpose="batch",
+        )
+        batch = await client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+    except Exception as exc:  # noqa: BLE001 - realtime generation remains the fallback
+        logger.warning("Daily batch submission for %s failed: %s", date_key, exc)
+        return None
+    await asave_daily_batch(date_key, batch.id, news_blob)
+    logger.info("Submitted daily batch %s for %s", batch.id, date_key)
+    return batch.id
+
+
+async def _fetch_batch_payload(client: AsyncOpenAI, batch, date_key: str) -> dict | None:
+    if batch.status != "completed" or not batch.output_file_id:
+        logger.info("Daily batch %s for %s unusable (status=%s)", batch.id, date_key, batch.status)
+        return None
+    content = await client.files.content(batch.output_file_id)
+    for line in content.text.splitlines():
+        if not line.strip():
+            continue
+        result = jsonutil.loads(line)
+        if result.get("custom_id") != _batch_custom_id(date_key):
+            continue
+        response = result.get("response") or {}
+        if response.get("status_code") != 200:
+            logger.warning("Daily batch %s request failed: %s", batch.id, result.get("error"))
+            return None
+        return jsonutil.loads(response["body"]["choices"][0]["message"]["content"])
+    return None
+
+
+async def _context_from_batch(
+    client: AsyncOpenAI,
+    signs: dict,
+    rss_url: str | None,
+    model: str,
+    today_key: str,
+    telegram_source: dict | None = None,
+    cancel_pending: bool = False,
+) -> dict | None:
+    """Build today's context from its finished batch; None if there is none.
+
+    With ``cancel_pending`` a batch still in flight is cancelled (the caller is
+    about to generate realtime). The caller holds _CTX_LOCK.
+    """
+    pending = await aload_daily_batch(today_key)
+    if pending is None:
+        return None
+    batch_id, news_blob = pending
+    try:
+        batch = await client.batches.retrieve(batch_id)
+        if batch.status in _BATCH_IN_FLIGHT:
+            if cancel_pending:
+                await client.batches.cancel(batch_id)
+                logger.info("Daily batch %s still %s; cancelled", batch_id, batch.status)
+            else:
+                logger.info("Daily batch %s not ready (status=%s)", batch_id, batch.status)
+            return None
+        payload = await _fetch_batch_payload(client, batch, today_key)
+    except Exception as exc:  # noqa: BLE001 - fall back to realtime generation
+        logger.warning("Daily batch %s retrieval failed: %s", batch_id, exc)
+        return None
+    if not payload:
+        return None
     context = await generate_daily_context(
-        client, signs, rss_url, model, telegram_source=telegram_source
+        client,
+        signs,
+        rss_url,
+        model,
+        telegram_source=telegram_source,
+        news_blob=news_blob,
+        payload=payload,
     )
-    save_today_context(today_key, context)
+    logger.info("Daily context for %s built from batch %s", today_key, batch_id)
     return context
 
 
+async def collect_daily_batch(
+    client: AsyncOpenAI,
+    signs: dict,
+    rss_url: str | None,
+    model: str,
+    timezone: ZoneInfo,
+    telegram_source: dict | None = None,
+) -> bool:
+    """Turn today's finished batch into the cached daily context.
+
+    Returns True if today's context is available afterwards. A batch that isn't
+    done yet is left running: the broadcast's own cache miss checks it once more
+    and cancels it before falling back to realtime generation.
+    """
+    today_key = datetime.now(timezone).date().isoformat()
+    async with _CTX_LOCK:
+        if today_key in _CTX_CACHE or await aload_today_context(today_key):
+            return True
+        context = await _context_from_batch(
+            client, signs, rss_url, model, today_key, telegram_source=telegram_source
+        )
+        if context is None:
+            return False
+        await asave_today_context(today_key, context)
+        _remember_context(today_key, context)
+        return True
+
+
 def build_personal_prompt(sign: str, sign_data: dict, context: dict, question: str) -> str:
     from telegram_io import display_sign_with_emoji
 
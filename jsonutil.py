@@ -0,0 +1,33 @@
+"""JSON encode/decode via orjson when installed, stdlib json otherwise.
+
+orjson is a native implementation that emits UTF-8 directly (no escaping cost
+for the Cyrillic-heavy contexts and prompts). Its JSONDecodeError subclasses
+json.JSONDecodeError, so callers keep catching the stdlib exception.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is a drop-in fallback
+    orjson = None
+
+
+def dumps(obj) -> str:
+    """Serialize to a str, non-ASCII left unescaped (like ensure_ascii=False)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def dumps_bytes(obj) -> bytes:
+    """Serialize straight to UTF-8 bytes (orjson's native output, no decode)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: str | bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -1,36 +1,40 @@
 import asyncio
 import logging
 import os
+import re
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
 from aiogram import Bot, Dispatcher, F
 from aiogram.filters import Command, CommandStart
 from aiogram.types import Message
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 
 from db import (
-    get_user_sign,
+    aset_user_sign,
+    aupsert_user,
+    aupsert_user_and_get_sign,
     init_db,
-    set_user_sign,
-    upsert_user,
 )
 from generation import (
     build_personal_prompt,
+    collect_daily_batch,
     complete_text,
     get_or_generate_context,
+    submit_daily_batch,
 )
+from news import close_telegram_client, start_telegram_client
 from prompts.loader import load_prompt
 from rubrics import post_hook, post_spotlight
 from telegram_io import (
+    SIGNS,
     broadcast_daily_vibes,
     build_channel_sign_messages,
     display_sign,
     display_sign_with_emoji,
-    load_signs,
     normalize_sign,
+    send_channel_messages,
     send_daily_cover,
     send_sign_cards,
 )
@@ -38,15 +42,15 @@ from telegram_io import (
 logger = logging.getLogger(__name__)
 
 
-def parse_admin_ids(raw_value: str | None) -> set[int]:
+# Whole comma/space-separated tokens made only of digits (so "-100123" or
+# "12abc" are ignored rather than partially matched).
+_ADMIN_ID_RE = re.compile(r"(?<![^\s,])\d+(?![^\s,])")
+
+
+def parse_admin_ids(raw_value: str | None) -> frozenset[int]:
     if not raw_value:
-        return set()
-    tokens = raw_value.replace(",", " ").split()
-    ids: set[int] = set()
-    for token in tokens:
-        if token.isdigit():
-            ids.add(int(token))
-    return ids
+        return frozenset()
+    return frozenset(int(token) for token in _ADMIN_ID_RE.findall(raw_value))
 
 
 async def main() -> None:
@@ -64,6 +68,7 @@ async def main() -> None:
     telegram_limit = int(os.getenv("TELEGRAM_NEWS_LIMIT", "20"))
     telethon_session = os.getenv("TELETHON_SESSION", "telethon.session")
     telethon_session_string = os.getenv("TELETHON_SESSION_STRING")
+    daily_batch = os.getenv("OPENAI_DAILY_BATCH", "").lower() in ("1", "true", "yes")
 
     if not telegram_token or not openai_key:
         raise RuntimeError("Missing TELEGRAM_BOT_TOKEN or OPENAI_API_KEY.")
@@ -71,7 +76,11 @@ async def main() -> None:
     timezone = ZoneInfo(timezone_name)
 
     init_db()
-    signs = load_signs()
+    signs = SIGNS
+    # The sign set is static; build the /set_sign error reply once.
+    unknown_sign_message = "Невідомий знак. Обери один із: " + ", ".join(
+        display_sign(s) for s in sorted(signs)
+    )
     client = AsyncOpenAI(api_key=openai_key)
     telegram_source = {
         "api_id": int(telegram_api_id) if telegram_api_id else None,
@@ -87,7 +96,7 @@ async def main() -> None:
 
     @dp.message(CommandStart())
     async def handle_start(message: Message) -> None:
-        upsert_user(message.from_user.id, message.chat.id, message.from_user.username)
+        await aupsert_user(message.from_user.id, message.chat.id, message.from_user.username)
         await message.answer(
             "Ласкаво просимо до Astro Vibe Bot! Вкажи знак зодіаку командою "
             "/set_sign <sign>, щоб отримувати вайб дня та персональні прогнози."
@@ -95,25 +104,23 @@ async def main() -> None:
 
     @dp.message(Command("set_sign"))
     async def handle_set_sign(message: Message) -> None:
-        upsert_user(message.from_user.id, message.chat.id, message.from_user.username)
+        await aupsert_user(message.from_user.id, message.chat.id, message.from_user.username)
         parts = (message.text or "").split(maxsplit=1)
         if len(parts) < 2:
             await message.answer("Використання: /set_sign Aries")
             return
         sign = normalize_sign(parts[1])
         if sign not in signs:
-            await message.answer(
-                "Невідомий знак. Обери один із: "
-                + ", ".join(display_sign(s) for s in sorted(signs.keys()))
-            )
+            await message.answer(unknown_sign_message)
             return
-        set_user_sign(message.from_user.id, sign)
+        await aset_user_sign(message.from_user.id, sign)
         await message.answer(f"Знак збережено: {display_sign(sign)}.")
 
     @dp.message(Command("vibe"))
     async def handle_vibe(message: Message) -> None:
-        upsert_user(message.from_user.id, message.chat.id, message.from_user.username)
-        sign = get_user_sign(message.from_user.id)
+        sign = await aupsert_user_and_get_sign(
+            message.from_user.id, message.chat.id, message.from_user.username
+        )
         if not sign:
             await message.answer("Вкажи знак: /set_sign <sign>.")
             return
@@ -130,7 +137,7 @@ async def main() -> None:
 
     @dp.message(Command("broadcast_now"))
     async def handle_broadcast_now(message: Message) -> None:
-        upsert_user(message.from_user.id, message.chat.id, message.from_user.username)
+        await aupsert_user(message.from_user.id, message.chat.id, message.from_user.username)
         if admin_ids and message.from_user.id not in admin_ids:
             await message.answer("Недостатньо прав для цієї команди.")
             return
@@ -149,10 +156,11 @@ async def main() -> None:
         cover_sent = await send_daily_cover(bot, client, channel_id, context, today_key)
         cards = await send_sign_cards(bot, client, channel_id, context, signs, today_key)
         if cards is None:
-            for channel_message in build_channel_sign_messages(
-                context, signs, include_intro=not cover_sent
-            ):
-                await bot.send_message(channel_id, channel_message)
+            await send_channel_messages(
+                bot,
+                channel_id,
+                build_channel_sign_messages(context, signs, include_intro=not cover_sent),
+            )
             status = "текстом (зображення недоступні, див. лог)"
         else:
             status = "обкладинка + 12 карток знаків"
@@ -160,7 +168,7 @@ async def main() -> None:
 
     @dp.message(Command("post_cover"))
     async def handle_post_cover(message: Message) -> None:
-        upsert_user(message.from_user.id, message.chat.id, message.from_user.username)
+        await aupsert_user(message.from_user.id, message.chat.id, message.from_user.username)
         if admin_ids and message.from_user.id not in admin_ids:
             await message.answer("Недостатньо прав для цієї команди.")
             return
@@ -186,7 +194,7 @@ async def main() -> None:
 
     @dp.message(Command("post_spotlight"))
     async def handle_post_spotlight(message: Message) -> None:
-        upsert_user(message.from_user.id, message.chat.id, message.from_user.username)
+        await aupsert_user(message.from_user.id, message.chat.id, message.from_user.username)
         if admin_ids and message.from_user.id not in admin_ids:
             await message.answer("Недостатньо прав для цієї команди.")
             return
@@ -198,7 +206,7 @@ async def main() -> None:
 
     @dp.message(Command("post_hook"))
     async def handle_post_hook(message: Message) -> None:
-        upsert_user(message.from_user.id, message.chat.id, message.from_user.username)
+        await aupsert_user(message.from_user.id, message.chat.id, message.from_user.username)
         if admin_ids and message.from_user.id not in admin_ids:
             await message.answer("Недостатньо прав для цієї команди.")
             return
@@ -210,8 +218,9 @@ async def main() -> None:
 
     @dp.message(F.text & ~F.text.startswith("/"))
     async def handle_personal_query(message: Message) -> None:
-        upsert_user(message.from_user.id, message.chat.id, message.from_user.username)
-        sign = get_user_sign(message.from_user.id)
+        sign = await aupsert_user_and_get_sign(
+            message.from_user.id, message.chat.id, message.from_user.username
+        )
         if not sign:
             await message.answer("Спочатку вкажи знак: /set_sign <sign>.")
             return
@@ -235,7 +244,15 @@ async def main() -> None:
         )
         await message.answer(answer)
 
-    scheduler = AsyncIOScheduler(timezone=timezone)
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+    # A stalled loop past the trigger time must not replay the jobs back-to-back
+    # (each replay means fresh OpenAI calls): fold missed runs into one, never
+    # overlap a job with itself, and still run if we're up to an hour late.
+    scheduler = AsyncIOScheduler(
+        timezone=timezone,
+        job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 3600},
+    )
     scheduler.add_job(
         broadcast_daily_vibes,
         "cron",
@@ -252,6 +269,13 @@ async def main() -> None:
             telegram_source,
         ],
     )
+    if daily_batch:
+        # Submit tomorrow's vibes to the Batch API in the evening and collect
+        # them just before the broadcast; if the batch is late, the 09:00 job
+        # generates realtime as usual.
+        batch_args = [client, signs, rss_url, model, timezone, telegram_source]
+        scheduler.add_job(submit_daily_batch, "cron", hour=20, minute=0, args=batch_args)
+        scheduler.add_job(collect_daily_batch, "cron", hour=8, minute=55, args=batch_args)
     scheduler.add_job(
         post_spotlight,
         "cron",
@@ -270,8 +294,16 @@ async def main() -> None:
     )
     scheduler.start()
 
+    # Connect Telethon in the background: news is optional, and a slow or
+    # unreachable DC must not hold up polling (the first fetch retries anyway).
+    telethon_start = asyncio.create_task(start_telegram_client(telegram_source))
     logger.info("Bot started; polling for updates")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        telethon_start.cancel()
+        await asyncio.gather(telethon_start, return_exceptions=True)
+        await close_telegram_client()
 
 
 if __name__ == "__main__":
@@ -1,10 +1,16 @@
+import asyncio
+import io
 import logging
+import re
+import time
 from urllib.parse import urlparse
 
-import feedparser
+import aiohttp
 
 logger = logging.getLogger(__name__)
 
+_WS = re.compile(r"\s+")
+
 
 def extract_invite_hash(channel: str) -> str | None:
     if not channel:
@@ -17,6 +23,93 @@ def extract_invite_hash(channel: str) -> str | None:
     return None
 
 
+# One Telethon client for the process lifetime: .start() is a full MTProto
+# handshake + auth, far costlier than the ~20-message read that follows it.
+# The lock keeps concurrent fetches from interleaving on the shared client.
+_TELETHON_CLIENT = None
+_TELETHON_LOCK = asyncio.Lock()
+_ENTITY_CACHE: dict[str, object] = {}
+
+
+async def _get_telethon_client(
+    api_id: int,
+    api_hash: str,
+    session_path: str,
+    session_string: str | None,
+):
+    global _TELETHON_CLIENT
+    if _TELETHON_CLIENT is None:
+        from telethon import TelegramClient
+        from telethon.sessions import StringSession
+
+        if session_string:
+            client = TelegramClient(StringSession(session_string), api_id, api_hash)
+        else:
+            client = TelegramClient(session_path, api_id, api_hash)
+        await client.start()
+        _TELETHON_CLIENT = client
+    elif not _TELETHON_CLIENT.is_connected():
+        await _TELETHON_CLIENT.connect()
+    return _TELETHON_CLIENT
+
+
+async def start_telegram_client(telegram_source: dict | None) -> None:
+    """Connect the shared Telethon client at startup so the first fetch is warm.
+
+    No-op without credentials or Telethon; a failure is logged and the first
+    fetch retries the connection.
+    """
+    if not telegram_source or not telegram_source.get("channel"):
+        return
+    api_id = telegram_source.get("api_id")
+    api_hash = telegram_source.get("api_hash")
+    if not api_id or not api_hash:
+        return
+    try:
+        import telethon  # noqa: F401
+    except Exception:
+        return
+    try:
+        async with _TELETHON_LOCK:
+            await _get_telethon_client(
+                api_id,
+                api_hash,
+                telegram_source.get("session_path", "telethon.session"),
+                telegram_source.get("session_string"),
+            )
+    except Exception as exc:  # noqa: BLE001 - news is optional at startup
+        logger.warning("Telethon client failed to start: %s", exc)
+
+
+async def close_telegram_client() -> None:
+    """Disconnect the shared Telethon client, if it was started."""
+    global _TELETHON_CLIENT
+    async with _TELETHON_LOCK:
+        if _TELETHON_CLIENT is not None:
+            await _TELETHON_CLIENT.disconnect()
+            _TELETHON_CLIENT = None
+
+
+async def _resolve_entity(client, channel: str):
+    entity = _ENTITY_CACHE.get(channel)
+    if entity is not None:
+        return entity
+    from telethon.tl.functions.messages import ImportChatInviteRequest
+
+    invite_hash = extract_invite_hash(channel)
+    if invite_hash:
+        try:
+            result = await client(ImportChatInviteRequest(invite_hash))
+            if getattr(result, "chats", None):
+                entity = result.chats[0]
+        except Exception:
+            entity = None
+    if entity is None:
+        entity = await client.get_entity(channel)
+    _ENTITY_CACHE[channel] = entity
+    return entity
+
+
 async def fetch_telegram_messages(
     api_id: int | None,
     api_hash: str | None,
@@ -28,51 +121,92 @@ async def fetch_telegram_messages(
     if not api_id or not api_hash or not channel:
         return []
     try:
-        from telethon import TelegramClient
-        from telethon.sessions import StringSession
-        from telethon.tl.functions.messages import ImportChatInviteRequest
+        import telethon  # noqa: F401
     except Exception:
         return []
 
-    if session_string:
-        client = TelegramClient(StringSession(session_string), api_id, api_hash)
-    else:
-        client = TelegramClient(session_path, api_id, api_hash)
-    await client.start()
-    try:
-        entity = None
-        invite_hash = extract_invite_hash(channel)
-        if invite_hash:
-            try:
-                result = await client(ImportChatInviteRequest(invite_hash))
-                if getattr(result, "chats", None):
-                    entity = result.chats[0]
-            except Exception:
-                entity = None
-        if entity is None:
-            entity = await client.get_entity(channel)
+    async with _TELETHON_LOCK:
+        client = await _get_telethon_client(api_id, api_hash, session_path, session_string)
+        entity = await _resolve_entity(client, channel)
         messages: list[str] = []
         async for message in client.iter_messages(entity, limit=limit):
             text = (message.message or "").strip()
             if not text:
                 continue
-            messages.append(" ".join(text.split()))
+            messages.append(_WS.sub(" ", text))
         return messages
-    finally:
-        await client.disconnect()
 
 
-def _rss_blob(rss_url: str | None) -> str:
-    if not rss_url:
-        return "Немає налаштованого джерела новин."
-    feed = feedparser.parse(rss_url)
-    items = []
-    for entry in feed.entries[:10]:
+# Parsed RSS blobs by URL: daily regenerations and crash-loop retries within the
+# hour reuse the last fetch instead of hitting the feed again.
+_RSS_TTL_SECONDS = 3600
+_RSS_CACHE: dict[str, tuple[float, str]] = {}
+# feedparser's own fetch has no timeout; a hung feed server would stall the
+# daily generation indefinitely.
+_RSS_TIMEOUT = aiohttp.ClientTimeout(total=10)
+# Single-flight: concurrent misses (the cron and a /vibe racing on a cold
+# cache) wait for one fetch and then read its cached result.
+_RSS_LOCK = asyncio.Lock()
+
+
+def _format_rss(entries: list) -> str:
+    """Bullet list of the first 10 entries; empty string if none had content."""
+    buf = io.StringIO()
+    for entry in entries[:10]:
         title = (entry.get("title") or "").strip()
         summary = (entry.get("summary") or "").strip()
         if title or summary:
-            items.append(f"- {title}: {summary}")
-    return "\n".join(items) if items else "Важливих новин немає."
+            buf.write(f"- {title}: {summary}\n")
+    return buf.getvalue().rstrip()
+
+
+async def _fetch_rss(rss_url: str) -> tuple[bytes, dict[str, str]]:
+    """Return the feed body and its response headers.
+
+    feedparser only sees the headers we hand it: Content-Type carries the
+    charset for feeds that don't declare one in the XML, and Content-Location
+    (defaulting to the final URL) is the base for relative links. It looks the
+    keys up in lowercase.
+    """
+    async with aiohttp.ClientSession(timeout=_RSS_TIMEOUT) as session:
+        async with session.get(rss_url) as response:
+            response.raise_for_status()
+            headers = {key.lower(): value for key, value in response.headers.items()}
+            headers.setdefault("content-location", str(response.url))
+            return await response.read(), headers
+
+
+async def _rss_blob(rss_url: str | None) -> str:
+    if not rss_url:
+        return "Немає налаштованого джерела новин."
+    cached = _RSS_CACHE.get(rss_url)
+    if cached and time.monotonic() - cached[0] < _RSS_TTL_SECONDS:
+        return cached[1]
+    async with _RSS_LOCK:
+        cached = _RSS_CACHE.get(rss_url)
+        if cached and time.monotonic() - cached[0] < _RSS_TTL_SECONDS:
+            return cached[1]
+        return await _fetch_rss_blob(rss_url)
+
+
+async def _fetch_rss_blob(rss_url: str) -> str:
+    try:
+        data, headers = await _fetch_rss(rss_url)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+        logger.warning("RSS fetch failed for %s: %s", rss_url, exc)
+        return "Важливих новин немає."
+    # Imported on first use like telethon: Telegram-news deployments may never
+    # reach the RSS path, so startup doesn't pay for loading feedparser.
+    import feedparser
+
+    # The XML parse is CPU-bound; keep it off the loop.
+    feed = await asyncio.to_thread(feedparser.parse, data, response_headers=headers)
+    blob = _format_rss(feed.entries)
+    if not blob:
+        # Don't cache an empty/failed fetch; the next call should retry.
+        return "Важливих новин немає."
+    _RSS_CACHE[rss_url] = (time.monotonic(), blob)
+    return blob
 
 
 async def fetch_news_blob(
@@ -98,10 +232,7 @@ async def fetch_news_blob(
             logger.info("Fetched %d Telegram news messages", len(messages))
             return news_blob
         logger.info("No Telegram news messages; falling back to RSS")
-        blob = _rss_blob(rss_url)
-        logger.info("RSS fallback produced %d chars", len(blob))
-        return blob
 
-    blob = _rss_blob(rss_url)
+    blob = await _rss_blob(rss_url)
     logger.info("Fetched news from RSS (%d chars)", len(blob))
     return blob
@@ -16,7 +16,7 @@ import yaml
 import db
 from generation import build_channel_system, complete_text
 from prompts.loader import load_prompt
-from telegram_io import SIGN_EMOJI, SIGN_NAME_UA
+from telegram_io import SIGN_EMOJI, SIGN_NAME_UA, rate_limited_send
 
 logger = logging.getLogger(__name__)
 
@@ -83,27 +83,27 @@ def psych_header(topic: str) -> str:
 async def post_spotlight(bot, client, signs: dict, model: str, channel_id: str | None) -> str:
     """Pick the next un-spotlighted sign, generate, send, and record it."""
     candidates = [sign for sign in SIGN_ORDER if sign in signs]
-    sign = db.next_subject(RUBRIC_SPOTLIGHT, candidates)
+    sign = await db.anext_subject(RUBRIC_SPOTLIGHT, candidates)
     if not sign:
         raise RuntimeError("No signs available for spotlight rotation.")
     body = await generate_sign_spotlight(client, sign, signs[sign], model)
     message = f"{spotlight_header(sign)}\n\n{body}"
     if channel_id and bot is not None:
-        await bot.send_message(channel_id, message)
-    db.record_rubric(RUBRIC_SPOTLIGHT, sign)
+        await rate_limited_send(bot.send_message, channel_id, message)
+    await db.arecord_rubric(RUBRIC_SPOTLIGHT, sign)
     logger.info("Posted sign spotlight: %s", sign)
     return message
 
 
 async def post_hook(bot, client, model: str, channel_id: str | None) -> str:
     """Pick the next un-used psych topic, generate, send, and record it."""
-    topic = db.next_subject(RUBRIC_PSYCH, load_psych_topics())
+    topic = await db.anext_subject(RUBRIC_PSYCH, load_psych_topics())
     if not topic:
         raise RuntimeError("No psych topics configured.")
     body = await generate_psych_hook(client, topic, model)
     message = f"{psych_header(topic)}\n\n{body}"
     if channel_id and bot is not None:
-        await bot.send_message(channel_id, message)
-    db.record_rubric(RUBRIC_PSYCH, topic)
+        await rate_limited_send(bot.send_message, channel_id, message)
+    await db.arecord_rubric(RUBRIC_PSYCH, topic)
     logger.info("Posted psych hook: %s", topic)
     return message
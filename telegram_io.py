@@ -1,22 +1,34 @@
+import asyncio
 import logging
 import os
+from collections import deque
 from datetime import datetime
+from functools import lru_cache
 
 import yaml
 from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
 from aiogram.types import BufferedInputFile
+from aiolimiter import AsyncLimiter
+from openai import AsyncOpenAI
+from tenacity import retry, retry_if_exception_type, stop_after_attempt
 from zoneinfo import ZoneInfo
 
+import jsonutil
 from db import (
-    get_all_users,
-    load_today_background,
-    save_today_background,
+    aclaim_daily_broadcast,
+    aget_all_users,
+    aload_today_background,
+    asave_today_background,
 )
 from generation import get_or_generate_context
 
 logger = logging.getLogger(__name__)
 
 SIGNS_PATH = os.path.join(os.path.dirname(__file__), "config", "signs.yaml")
+# JSON snapshot of signs.yaml stamped with the YAML's mtime: JSON decoding is C-fast,
+# yaml.safe_load is pure Python unless libyaml is around. Rebuilt when stale.
+SIGNS_CACHE_PATH = os.path.join(os.path.dirname(__file__), "config", "signs.cache.json")
 
 SIGN_NAME_UA = {
     "Aries": "Овен",
@@ -47,16 +59,76 @@ SIGN_EMOJI = {
     "Pisces": "♓",
 }
 SIGN_NAME_EN = {ua: en for en, ua in SIGN_NAME_UA.items()}
+# Case-folded English keys and Ukrainian names -> English key, so any casing of
+# "aries" / "ОВЕН" normalizes with one dict lookup.
+SIGN_LOOKUP = {
+    **{en.casefold(): en for en in SIGN_NAME_UA},
+    **{ua.casefold(): en for ua, en in SIGN_NAME_EN.items()},
+}
+# "♈ Овен"-style headers, built once instead of per sign on every broadcast.
+SIGN_HEADERS = {
+    sign: f"{SIGN_EMOJI.get(sign, '')} {ua}".strip() for sign, ua in SIGN_NAME_UA.items()
+}
+
+# Telegram caps bots at ~30 messages/second overall. Every bot-initiated send
+# (user broadcast, channel posts and cards, rubrics) goes through this limiter
+# via rate_limited_send; direct replies to a user's command (message.answer) do not.
+TELEGRAM_RATE_LIMIT = 30
+_send_limiter = AsyncLimiter(TELEGRAM_RATE_LIMIT, 1)
+# Concurrent senders for the user broadcast; enough to saturate the rate limit
+# at typical Bot API latency.
+BROADCAST_SENDERS = 8
+
 
+def _wait_retry_after(retry_state) -> float:
+    # Flood control tells us exactly how long to back off; honour it.
+    return retry_state.outcome.exception().retry_after
+
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=_wait_retry_after,
+    retry=retry_if_exception_type(TelegramRetryAfter),
+    reraise=True,
+)
+async def rate_limited_send(method, *args, **kwargs):
+    """Call a Bot send method under the rate limiter, retrying on flood control."""
+    async with _send_limiter:
+        return await method(*args, **kwargs)
 
+
+@lru_cache(maxsize=None)
 def load_signs() -> dict:
+    """Load config/signs.yaml. Parsed once per process; treat the result as read-only."""
+    mtime = os.path.getmtime(SIGNS_PATH)
+    try:
+        with open(SIGNS_CACHE_PATH, "rb") as handle:
+            cached = jsonutil.loads(handle.read())
+        if cached["mtime"] == mtime:
+            return cached["signs"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
     with open(SIGNS_PATH, "r", encoding="utf-8") as handle:
-        return yaml.safe_load(handle) or {}
+        signs = yaml.safe_load(handle) or {}
+    try:
+        tmp_path = f"{SIGNS_CACHE_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            handle.write(jsonutil.dumps({"mtime": mtime, "signs": signs}))
+        os.replace(tmp_path, SIGNS_CACHE_PATH)
+    except OSError as exc:  # read-only checkout: just parse YAML every start
+        logger.debug("Could not write %s: %s", SIGNS_CACHE_PATH, exc)
+    return signs
+
+
+# Static sign config, loaded once at import. The bot passes this same object
+# everywhere, so identity-keyed caches downstream (prompt payload JSON, channel
+# posts) are built once per process.
+SIGNS = load_signs()
 
 
 def normalize_sign(sign: str) -> str:
-    normalized = sign.strip().title()
-    return SIGN_NAME_EN.get(normalized, normalized)
+    sign = sign.strip()
+    return SIGN_LOOKUP.get(sign.casefold(), sign)
 
 
 def display_sign(sign: str) -> str:
@@ -64,34 +136,75 @@ def display_sign(sign: str) -> str:
 
 
 def display_sign_with_emoji(sign: str) -> str:
-    return f"{SIGN_EMOJI.get(sign, '')} {display_sign(sign)}".strip()
+    header = SIGN_HEADERS.get(sign)
+    if header is None:
+        header = f"{SIGN_EMOJI.get(sign, '')} {display_sign(sign)}".strip()
+    return header
+
+
+# Last built channel posts, keyed by the identity of the (memoized) daily context
+# and signs config: the scheduled broadcast and repeated /broadcast_now on the
+# same day reuse them. A new day's context is a new object, so it misses.
+_CHANNEL_MESSAGES: tuple[dict, dict, dict[bool, list[str]]] | None = None
 
 
 def build_channel_sign_messages(
     context: dict, signs: dict, include_intro: bool = True
+) -> list[str]:
+    global _CHANNEL_MESSAGES
+    if (
+        _CHANNEL_MESSAGES is None
+        or _CHANNEL_MESSAGES[0] is not context
+        or _CHANNEL_MESSAGES[1] is not signs
+    ):
+        _CHANNEL_MESSAGES = (context, signs, {})
+    built = _CHANNEL_MESSAGES[2]
+    if include_intro not in built:
+        built[include_intro] = _build_channel_sign_messages(context, signs, include_intro)
+    return list(built[include_intro])
+
+
+def _build_channel_sign_messages(
+    context: dict, signs: dict, include_intro: bool
 ) -> list[str]:
     vibes = context.get("vibes", {})
-    global_summary = context.get("global_summary", "")
-    affirmation = context.get("affirmation", "")
-    messages: list[str] = []
-    first = True
-    for sign in signs.keys():
-        vibe = vibes.get(sign, "Вайб формується. Перевір пізніше.")
-        lines: list[str] = []
-        if first and include_intro:
-            if affirmation:
-                lines.append(affirmation)
-            if global_summary:
-                lines.append(global_summary)
-            if lines:
-                lines.append("")
-        first = False
-        lines.append(f"{display_sign_with_emoji(sign)}: {vibe}")
-        messages.append("\n".join(lines).strip())
+    messages = [
+        f"{display_sign_with_emoji(sign)}: "
+        f"{vibes.get(sign, 'Вайб формується. Перевір пізніше.')}".strip()
+        for sign in signs
+    ]
+    if include_intro and messages:
+        intro = "\n".join(
+            part for part in (context.get("affirmation"), context.get("global_summary")) if part
+        )
+        if intro:
+            messages[0] = f"{intro}\n\n{messages[0]}".strip()
     return messages
 
 
-async def _get_daily_background(client, intro: str, today_key: str, force: bool) -> bytes:
+async def send_channel_messages(
+    bot: Bot, channel_id: str, messages: list[str]
+) -> tuple[int, int]:
+    """Post text messages to the channel in order, under the send rate limit.
+
+    Sequential on purpose: the sign posts must appear in zodiac order. Returns
+    (sent, failed); per-message failures are logged, never raised.
+    """
+    sent = 0
+    failed = 0
+    for message in messages:
+        try:
+            await rate_limited_send(bot.send_message, channel_id, message)
+            sent += 1
+        except Exception as exc:
+            failed += 1
+            logger.warning("Failed to send to channel=%s: %s", channel_id, exc)
+    return sent, failed
+
+
+async def _get_daily_background(
+    client: AsyncOpenAI, intro: str, today_key: str, force: bool
+) -> bytes:
     """Return the raw AI background for the day, generating+caching once.
 
     One image/day is reused for the cover and all 12 sign cards. force=True
@@ -99,19 +212,24 @@ async def _get_daily_background(client, intro: str, today_key: str, force: bool)
     """
     import render  # local import: Pillow only needed when covers are used
 
-    background = None if force else load_today_background(today_key)
+    background = None if force else await aload_today_background(today_key)
     if background is None:
         # Seed the look with the date so each day differs; when force-regenerating
         # within the same day, add entropy so /post_cover yields a new background.
         seed = today_key if not force else f"{today_key}-{datetime.now().timestamp()}"
         prompt = render.build_background_prompt(intro, day_seed=seed)
         background = await render.generate_background(client, prompt)
-        save_today_background(today_key, background)
+        await asave_today_background(today_key, background)
     return background
 
 
 async def send_daily_cover(
-    bot: Bot, client, channel_id: str, context: dict, today_key: str, force: bool = False
+    bot: Bot,
+    client: AsyncOpenAI,
+    channel_id: str,
+    context: dict,
+    today_key: str,
+    force: bool = False,
 ) -> bool:
     """Render+send the daily cover image. Returns True on success.
 
@@ -125,8 +243,9 @@ async def send_daily_cover(
         affirmation = context.get("affirmation", "")
         intro = context.get("global_summary", "")
         background = await _get_daily_background(client, intro, today_key, force)
-        buf = render.render_card(affirmation, intro, background)
-        await bot.send_photo(
+        buf = await asyncio.to_thread(render.render_card, affirmation, intro, background)
+        await rate_limited_send(
+            bot.send_photo,
             channel_id,
             BufferedInputFile(buf.getvalue(), filename="vibe.png"),
         )
@@ -136,8 +255,17 @@ async def send_daily_cover(
         return False
 
 
+# Cards rendered ahead of the one being sent (see send_sign_cards).
+_CARD_RENDER_AHEAD = 1
+
+
 async def send_sign_cards(
-    bot: Bot, client, channel_id: str, context: dict, signs: dict, today_key: str,
+    bot: Bot,
+    client: AsyncOpenAI,
+    channel_id: str,
+    context: dict,
+    signs: dict,
+    today_key: str,
     force: bool = False,
 ) -> tuple[int, int] | None:
     """Render+send one image card per sign on the shared daily background.
@@ -155,17 +283,37 @@ async def send_sign_cards(
         logger.warning("Sign cards: background unavailable (%s); using text", exc)
         return None
 
+    # Pillow work is CPU-bound and releases the GIL, so the next card renders on
+    # a worker thread while the current one is being sent; posts still go out
+    # strictly in zodiac order. The lookahead is bounded: the default executor
+    # also runs every DB call, and each render holds a full decoded background.
     vibes = context.get("vibes", {})
+    order = list(signs)
+
+    def start_render(sign: str) -> asyncio.Task:
+        return asyncio.create_task(
+            asyncio.to_thread(
+                render.render_sign_card,
+                SIGN_EMOJI.get(sign, "✨"),
+                display_sign(sign),
+                vibes.get(sign, "Вайб формується. Перевір пізніше."),
+                background,
+            )
+        )
+
+    renders: deque[asyncio.Task] = deque()
     sent = 0
     failed = 0
-    for sign in signs:
-        vibe = vibes.get(sign, "Вайб формується. Перевір пізніше.")
+    for index, sign in enumerate(order):
+        while len(renders) <= _CARD_RENDER_AHEAD and index + len(renders) < len(order):
+            renders.append(start_render(order[index + len(renders)]))
+        pending = renders.popleft()
         try:
-            buf = render.render_sign_card(
-                SIGN_EMOJI.get(sign, "✨"), display_sign(sign), vibe, background
-            )
-            await bot.send_photo(
-                channel_id, BufferedInputFile(buf.getvalue(), filename=f"{sign}.png")
+            buf = await pending
+            await rate_limited_send(
+                bot.send_photo,
+                channel_id,
+                BufferedInputFile(buf.getvalue(), filename=f"{sign}.png"),
             )
             sent += 1
         except Exception as exc:  # noqa: BLE001
@@ -174,9 +322,19 @@ async def send_sign_cards(
     return sent, failed
 
 
+def _user_vibe_message(sign: str | None, vibes: dict, global_summary: str) -> str:
+    if not sign:
+        return "Вкажи свій знак зодіаку: /set_sign <sign>, щоб отримувати вайб дня."
+    vibe = vibes.get(sign, "Вайб формується. Перевір пізніше.")
+    message = f"Вайб дня для {display_sign_with_emoji(sign)}:\n{vibe}"
+    if global_summary:
+        message += f"\n\nГлобальний контекст: {global_summary}"
+    return message
+
+
 async def broadcast_daily_vibes(
     bot: Bot,
-    client,
+    client: AsyncOpenAI,
     signs: dict,
     rss_url: str | None,
     model: str,
@@ -184,6 +342,10 @@ async def broadcast_daily_vibes(
     channel_id: str | None,
     telegram_source: dict | None,
 ) -> None:
+    today_key = datetime.now(timezone).date().isoformat()
+    if not await aclaim_daily_broadcast(today_key):
+        logger.info("Daily broadcast for %s already ran; skipping.", today_key)
+        return
     context = await get_or_generate_context(
         client,
         signs,
@@ -194,41 +356,51 @@ async def broadcast_daily_vibes(
     )
     vibes = context.get("vibes", {})
     global_summary = context.get("global_summary", "")
+    users = await aget_all_users()
+
+    # Producer/consumer: a bounded queue feeds a fixed pool of senders, so sends
+    # overlap (latency doesn't add up per user) while in-flight work and memory
+    # stay capped regardless of how many users there are.
+    queue: asyncio.Queue[tuple[int, str] | None] = asyncio.Queue(maxsize=64)
     sent = 0
     failed = 0
-    for _, chat_id, sign in get_all_users():
-        if not sign:
-            message = (
-                "Вкажи свій знак зодіаку: /set_sign <sign>, щоб отримувати вайб дня."
-            )
-        else:
-            vibe = vibes.get(sign, "Вайб формується. Перевір пізніше.")
-            message = f"Вайб дня для {display_sign_with_emoji(sign)}:\n{vibe}"
-            if global_summary:
-                message += f"\n\nГлобальний контекст: {global_summary}"
-        try:
-            await bot.send_message(chat_id, message)
-            sent += 1
-        except Exception as exc:
-            failed += 1
-            logger.warning("Failed to send to chat_id=%s: %s", chat_id, exc)
+
+    async def sender() -> None:
+        nonlocal sent, failed
+        while (item := await queue.get()) is not None:
+            chat_id, message = item
+            try:
+                await rate_limited_send(bot.send_message, chat_id, message)
+                sent += 1
+            except Exception as exc:
+                failed += 1
+                logger.warning("Failed to send to chat_id=%s: %s", chat_id, exc)
+
+    senders = [asyncio.create_task(sender()) for _ in range(BROADCAST_SENDERS)]
+    # Every user with the same sign gets the same text: format it once per sign.
+    by_sign: dict[str | None, str] = {}
+    for _, chat_id, sign in users:
+        message = by_sign.get(sign)
+        if message is None:
+            message = by_sign[sign] = _user_vibe_message(sign, vibes, global_summary)
+        await queue.put((chat_id, message))
+    for _ in senders:
+        await queue.put(None)
+    await asyncio.gather(*senders)
 
     if channel_id:
-        today_key = datetime.now(timezone).date().isoformat()
         cover_sent = await send_daily_cover(bot, client, channel_id, context, today_key)
         cards = await send_sign_cards(bot, client, channel_id, context, signs, today_key)
         if cards is None:
             # Image pipeline down: fall back to text sign posts (intro included
             # only if the cover image also failed, to avoid duplication).
-            for channel_message in build_channel_sign_messages(
-                context, signs, include_intro=not cover_sent
-            ):
-                try:
-                    await bot.send_message(channel_id, channel_message)
-                    sent += 1
-                except Exception as exc:
-                    failed += 1
-                    logger.warning("Failed to send to channel=%s: %s", channel_id, exc)
+            text_sent, text_failed = await send_channel_messages(
+                bot,
+                channel_id,
+                build_channel_sign_messages(context, signs, include_intro=not cover_sent),
+            )
+            sent += text_sent
+            failed += text_failed
         else:
             card_sent, card_failed = cards
             sent += card_sent